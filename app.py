@@ -3,6 +3,8 @@ import pandas as pd
 from datetime import date, timedelta
 from youtube_api import get_youtube_client, search_videos, get_video_details, search_and_filter_videos
 from deep_translator import GoogleTranslator
+import video_index
+from thumbnail_cache import get_thumbnail_data_uris
 import io
 from datetime import date, timedelta
 from youtube_api import get_youtube_client, search_videos, get_video_details, search_and_filter_videos
@@ -13,6 +15,13 @@ st.set_page_config(page_title="유튜브 트렌드 분석기", page_icon="📈",
 
 st.title("📈 유튜브 트렌드 분석기")
 
+# Local metadata index shared by all sessions (repeat searches skip the search API)
+@st.cache_resource
+def get_video_index():
+    return video_index.open_index()
+
+index_conn = get_video_index()
+
 # Sidebar - Settings
 with st.sidebar:
     st.header("설정")
@@ -106,6 +115,13 @@ with st.sidebar:
         </style>
     """, unsafe_allow_html=True)
     
+    # Local index: answer repeat searches without spending search quota
+    refresh_stale = st.checkbox(
+        "오래된 저장 결과는 API로 갱신 (24시간 이상)",
+        value=True,
+        help="끄면 이전에 검색한 결과가 오래되었더라도 API 할당량을 쓰지 않고 저장된 결과를 보여줍니다."
+    )
+
     start_search = st.button("동영상 검색", type="primary", use_container_width=True)
 
 
@@ -166,7 +182,11 @@ else:
                     # Only translate if query contains Hangul (Korean characters)
                     if any(ord('가') <= ord(char) <= ord('힣') for char in query):
                          try:
-                             translated_query = GoogleTranslator(source='auto', target='ja').translate(query)
+                             # Reuse a saved translation so repeat searches also work offline
+                             translated_query = video_index.get_translation(index_conn, query, 'ja')
+                             if not translated_query:
+                                 translated_query = GoogleTranslator(source='auto', target='ja').translate(query)
+                                 video_index.save_translation(index_conn, query, 'ja', translated_query)
                              st.info(f"🇯🇵 정확한 일본 검색을 위해 '{query}' -> '{translated_query}'(으)로 번역하여 검색합니다.")
                              query = translated_query
                          except Exception as e:
@@ -186,7 +206,9 @@ else:
                         min_duration_sec=min_sec,
                         max_duration_sec=max_sec,
                         region_code=region_code,
-                        relevance_language=relevance_lang
+                        relevance_language=relevance_lang,
+                        index_conn=index_conn,
+                        refresh_stale=refresh_stale
                     )
                     
                     if not df.empty:
@@ -203,6 +225,23 @@ else:
                         st.error("🚨 유튜브 API 일일 할당량을 초과했습니다. (Quota Exceeded)")
                         st.warning("내일(오후 5시 이후) 다시 시도하거나, 새로운 API 키를 발급받아 교체해주세요.")
                         st.info("ℹ️ 유튜브 데이터 API는 하루 할당량이 제한되어 있습니다. 많은 검색이나 개발 테스트 시 금방 소진될 수 있습니다.")
+
+                        # Fall back to videos already collected in the local index
+                        offline_df = video_index.search_index(
+                            index_conn,
+                            query,
+                            start_date=start_date,
+                            end_date=end_date,
+                            target_count=max_results,
+                            min_duration_sec=min_sec,
+                            max_duration_sec=max_sec,
+                            region_code=region_code,
+                            relevance_language=relevance_lang
+                        )
+                        if not offline_df.empty:
+                            st.session_state["last_result"] = offline_df
+                            st.session_state["last_query"] = query
+                            st.info(f"💾 저장된 검색 기록에서 관련 동영상 {len(offline_df)}개를 대신 보여줍니다.")
                     else:
                         st.error(f"오류가 발생했습니다: {e}")
                         st.write(f"상세 에러 내용: {str(e)}")
@@ -243,6 +282,11 @@ else:
         display_df['Subscribers'] = display_df['Subscribers'].apply(format_kr_number)
         # Comments was not explicitly asked but good to consist, but user specified 3. Let's keep comments as is or format? User said "Likes, Views, Subs".
         
+        # Serve thumbnails as small data URIs from the disk cache instead of letting
+        # every browser pull them from YouTube on each rerun. Misses keep the original
+        # URL and are cached in the background, so a slow network never blocks the table.
+        display_df['Thumbnail'] = get_thumbnail_data_uris(list(display_df['Thumbnail']), background=True)
+
         # Dataframe with Image Column
         st.dataframe(
             display_df,
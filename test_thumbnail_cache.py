@@ -0,0 +1,173 @@
+import io
+import os
+import time
+import base64
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+from PIL import Image
+
+import thumbnail_cache
+from thumbnail_cache import THUMBNAIL_WIDTH, get_thumbnail_data_uri, get_thumbnail_data_uris
+from youtube_api import pick_thumbnail
+
+
+@pytest.fixture(autouse=True)
+def reset_failures():
+    thumbnail_cache._failed_urls.clear()
+    yield
+    thumbnail_cache._failed_urls.clear()
+
+
+def _jpeg(width, height, color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def image_server():
+    """Local stand-in for i.ytimg.com: serves a 480x360 JPEG for any *.jpg path, 404 otherwise."""
+    image = _jpeg(480, 360, 'red')
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            if self.path.split('?')[0].endswith('.jpg'):
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(image)))
+                self.end_headers()
+                self.wfile.write(image)
+            else:
+                self.send_error(404)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", requests
+    server.shutdown()
+    server.server_close()
+
+
+def _decode(data_uri):
+    assert data_uri.startswith("data:image/jpeg;base64,")
+    return Image.open(io.BytesIO(base64.b64decode(data_uri.split(',', 1)[1])))
+
+
+def test_pick_thumbnail():
+    thumbnails = {
+        'default': {'url': 'd', 'width': 120, 'height': 90},
+        'medium': {'url': 'm', 'width': 320, 'height': 180},
+        'high': {'url': 'h', 'width': 480, 'height': 360}
+    }
+    assert pick_thumbnail(thumbnails) == 'm'
+    assert pick_thumbnail(thumbnails, min_width=100) == 'd'
+    assert pick_thumbnail(thumbnails, min_width=1000) == 'h'
+    # Only a too-small resolution available: use it anyway
+    assert pick_thumbnail({'default': {'url': 'd', 'width': 120}}) == 'd'
+    # Missing width falls back to YouTube's standard size for that resolution
+    assert pick_thumbnail({'default': {'url': 'd'}, 'medium': {'url': 'm'}}) == 'm'
+
+
+def test_downscales_and_serves_from_disk(image_server, tmp_path):
+    base_url, requests = image_server
+    url = f"{base_url}/vi/abc/hqdefault.jpg"
+
+    image = _decode(get_thumbnail_data_uri(url, cache_dir=str(tmp_path)))
+    assert image.size == (THUMBNAIL_WIDTH, THUMBNAIL_WIDTH * 360 // 480)
+    assert len(requests) == 1
+
+    # Second call is served from the disk cache without a new request
+    assert _decode(get_thumbnail_data_uri(url, cache_dir=str(tmp_path))).size == image.size
+    assert len(requests) == 1
+
+
+def test_eviction_keeps_cache_under_limit(image_server, tmp_path):
+    base_url, _ = image_server
+    max_bytes = 3000
+
+    for i in range(20):
+        get_thumbnail_data_uri(f"{base_url}/vi/{i}/hqdefault.jpg", cache_dir=str(tmp_path), max_cache_bytes=max_bytes)
+
+    files = os.listdir(tmp_path)
+    assert files
+    assert sum(os.path.getsize(tmp_path / name) for name in files) <= max_bytes
+
+
+def test_eviction_only_rescans_when_over_cap(image_server, tmp_path, monkeypatch):
+    base_url, _ = image_server
+    scans = []
+    real_evict = thumbnail_cache._evict
+
+    def counting_evict(cache_dir, max_cache_bytes):
+        scans.append(cache_dir)
+        real_evict(cache_dir, max_cache_bytes)
+
+    monkeypatch.setattr(thumbnail_cache, '_evict', counting_evict)
+    for i in range(20):
+        get_thumbnail_data_uri(f"{base_url}/vi/{i}/hqdefault.jpg", cache_dir=str(tmp_path))
+
+    # One initial scan to learn the directory size; the cap is never reached
+    assert len(scans) == 1
+
+
+def test_missing_image_falls_back_to_url(image_server, tmp_path):
+    base_url, requests = image_server
+    url = f"{base_url}/vi/missing/hqdefault.png"
+    assert get_thumbnail_data_uri(url, cache_dir=str(tmp_path)) == url
+
+    # The failure is remembered, so the next rerun doesn't wait on it again
+    assert get_thumbnail_data_uri(url, cache_dir=str(tmp_path)) == url
+    assert len(requests) == 1
+
+
+def test_failed_url_is_retried_after_window(image_server, tmp_path, monkeypatch):
+    base_url, requests = image_server
+    url = f"{base_url}/vi/missing/hqdefault.png"
+    monkeypatch.setattr(thumbnail_cache, 'FAILURE_RETRY_SECONDS', 0)
+
+    get_thumbnail_data_uri(url, cache_dir=str(tmp_path))
+    get_thumbnail_data_uri(url, cache_dir=str(tmp_path))
+    assert len(requests) == 2
+
+
+def test_background_mode_returns_url_then_cached_image(image_server, tmp_path):
+    base_url, requests = image_server
+    url = f"{base_url}/vi/bg/hqdefault.jpg"
+
+    # Miss: the original URL comes back at once and the cache fills in the background
+    assert get_thumbnail_data_uris([url, url], background=True, cache_dir=str(tmp_path)) == [url, url]
+
+    for _ in range(50):
+        if os.path.exists(thumbnail_cache._cache_path(str(tmp_path), url)):
+            break
+        time.sleep(0.05)
+    result = get_thumbnail_data_uri(url, background=True, cache_dir=str(tmp_path))
+    assert _decode(result).width == THUMBNAIL_WIDTH
+    assert len(requests) == 1
+
+
+def test_concurrent_fetches_of_same_url(image_server, tmp_path):
+    base_url, _ = image_server
+    url = f"{base_url}/vi/same/hqdefault.jpg"
+
+    results = get_thumbnail_data_uris([url] * 16, cache_dir=str(tmp_path))
+    assert all(r.startswith("data:image/jpeg;base64,") for r in results)
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_unwritable_cache_still_returns_image(image_server, tmp_path, monkeypatch):
+    base_url, _ = image_server
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(thumbnail_cache.tempfile, 'mkstemp', fail)
+    result = get_thumbnail_data_uri(f"{base_url}/vi/x/hqdefault.jpg", cache_dir=str(tmp_path))
+    assert _decode(result).width == THUMBNAIL_WIDTH
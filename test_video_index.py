@@ -0,0 +1,208 @@
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import video_index
+from video_index import open_index, index_videos, record_search, lookup_search, search_index
+
+START = date(2026, 10, 1)
+END = date(2026, 10, 19)
+
+
+@pytest.fixture
+def conn():
+    conn = open_index(':memory:')
+    yield conn
+    conn.close()
+
+
+def _add(conn, video_id, title, day=5, duration_sec=60, views=100, channel='Channel'):
+    """Indexes one video as if get_video_details had returned it."""
+    video = {
+        'video_id': video_id,
+        'title': title,
+        'channel_id': 'UC' + channel,
+        'channel_title': channel,
+        'published_at': f"2026-10-{day:02}T00:00:00Z",
+        'thumbnail': f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg",
+        'video_url': f"https://www.youtube.com/watch?v={video_id}"
+    }
+    details = pd.DataFrame([{
+        'Duration': f"{duration_sec // 60}:{duration_sec % 60:02}",
+        'DurationSec': duration_sec,
+        'Views': views,
+        'Likes': 0,
+        'Comments': 0,
+        'Subscribers': 10
+    }])
+    index_videos(conn, [video], details)
+    return video_id
+
+
+def _search(conn, query='economy news', **kwargs):
+    """Records a KR economy search over START..END with three videos of 1, 4 and 10 minutes."""
+    ids = [
+        _add(conn, 'a', 'Economy news today', day=3, duration_sec=60, views=300),
+        _add(conn, 'b', 'Economy weekly', day=10, duration_sec=240, views=200),
+        _add(conn, 'c', 'Market wrap', day=15, duration_sec=600, views=100),
+    ]
+    args = dict(start_date=START, end_date=END, region_code='KR', relevance_language='ko', complete=True)
+    args.update(kwargs)
+    record_search(conn, query, ids, **args)
+
+
+def _lookup(conn, query='economy news', **kwargs):
+    args = dict(start_date=START, end_date=END, target_count=30, region_code='KR', relevance_language='ko')
+    args.update(kwargs)
+    return lookup_search(conn, query, **args)
+
+
+def test_same_bounds_is_a_hit(conn):
+    _search(conn)
+    df = _lookup(conn)
+    assert df['Link'].str[-1].tolist() == ['a', 'b', 'c']
+    assert df['Performance (Views/Subs)'].tolist() == ['30.0x', '20.0x', '10.0x']
+
+
+def test_query_normalization(conn):
+    _search(conn)
+    assert _lookup(conn, query='  ECONOMY   News ') is not None
+    assert _lookup(conn, query='ｅｃｏｎｏｍｙ news') is not None
+
+
+def test_narrower_bounds_are_a_hit(conn):
+    _search(conn)
+    assert _lookup(conn, start_date=date(2026, 10, 5))['Link'].str[-1].tolist() == ['b', 'c']
+    assert _lookup(conn, end_date=date(2026, 10, 12))['Link'].str[-1].tolist() == ['a', 'b']
+    assert _lookup(conn, min_duration_sec=180)['Link'].str[-1].tolist() == ['b', 'c']
+    assert _lookup(conn, max_duration_sec=180)['Link'].str[-1].tolist() == ['a']
+
+
+def test_wider_bounds_are_a_miss(conn):
+    _search(conn, min_duration_sec=180, max_duration_sec=900)
+    assert _lookup(conn, min_duration_sec=180, max_duration_sec=900) is not None
+    assert _lookup(conn, start_date=date(2026, 9, 1), min_duration_sec=180, max_duration_sec=900) is None
+    assert _lookup(conn, end_date=date(2026, 10, 20), min_duration_sec=180, max_duration_sec=900) is None
+    assert _lookup(conn, start_date=None, min_duration_sec=180, max_duration_sec=900) is None
+    assert _lookup(conn, min_duration_sec=60, max_duration_sec=900) is None
+    assert _lookup(conn, min_duration_sec=180) is None
+
+
+def test_other_search_keys_are_a_miss(conn):
+    _search(conn)
+    assert _lookup(conn, query='economy') is None
+    assert _lookup(conn, region_code='JP') is None
+    assert _lookup(conn, relevance_language='ja') is None
+    assert _lookup(conn, category_id='25') is None
+
+
+def test_incomplete_search_needs_target_count_rows(conn):
+    _search(conn, complete=False)
+    assert len(_lookup(conn, target_count=3)) == 3
+    assert len(_lookup(conn, target_count=2)) == 2
+    assert _lookup(conn, target_count=4) is None
+    # Narrower filter leaves two rows, fewer than the target
+    assert _lookup(conn, target_count=3, min_duration_sec=180) is None
+
+
+def test_stale_entry_is_a_miss_unless_allowed(conn):
+    _search(conn)
+    old = (datetime.now() - timedelta(hours=48)).isoformat()
+    conn.execute("UPDATE searches SET fetched_at = ?", (old,))
+    conn.commit()
+
+    assert _lookup(conn) is None
+    assert _lookup(conn, max_age_hours=72) is not None
+    assert len(_lookup(conn, allow_stale=True)) == 3
+
+
+def test_search_index_filters_region_and_language(conn):
+    _search(conn)
+    jp_id = _add(conn, 'j', 'Economy news Japan', day=5, views=1000)
+    record_search(conn, 'economy', [jp_id], region_code='JP', relevance_language='ja', complete=True)
+
+    kr = search_index(conn, 'economy', region_code='KR', relevance_language='ko')
+    assert kr['Link'].str[-1].tolist() == ['a', 'b']
+    jp = search_index(conn, 'economy', region_code='JP', relevance_language='ja')
+    assert jp['Link'].str[-1].tolist() == ['j']
+    assert search_index(conn, 'economy').empty
+
+
+def test_search_index_applies_date_and_duration_filters(conn):
+    _search(conn)
+    df = search_index(conn, 'economy', start_date=date(2026, 10, 5), region_code='KR', relevance_language='ko')
+    assert df['Link'].str[-1].tolist() == ['b']
+    df = search_index(conn, 'economy', max_duration_sec=120, region_code='KR', relevance_language='ko')
+    assert df['Link'].str[-1].tolist() == ['a']
+
+
+def test_search_index_matches_inside_cjk_text(conn):
+    ids = [
+        _add(conn, 'k', '京都旅行ガイド 2026'),
+        _add(conn, 'e', '경제를 알자'),
+        _add(conn, 'x', '100%_real'),
+    ]
+    record_search(conn, 'q', ids)
+
+    assert search_index(conn, '旅行')['Title'].tolist() == ['京都旅行ガイド 2026']
+    assert search_index(conn, '京都旅行')['Title'].tolist() == ['京都旅行ガイド 2026']
+    # Terms under 3 characters cannot use trigram MATCH and fall back to LIKE
+    assert search_index(conn, '경제')['Title'].tolist() == ['경제를 알자']
+    # LIKE wildcards in the query are matched literally
+    assert search_index(conn, '%_')['Title'].tolist() == ['100%_real']
+    assert search_index(conn, '_').shape[0] == 1
+
+
+def test_search_index_without_fts_normalizes_width_and_case(monkeypatch):
+    monkeypatch.setattr(video_index, '_create_fts', lambda conn: None)
+    conn = open_index(':memory:')
+    assert not video_index._has_fts(conn)
+
+    ids = [_add(conn, 'f', 'ＡＢＣ Cooking'), _add(conn, 'o', 'Other')]
+    record_search(conn, 'q', ids)
+    assert search_index(conn, 'abc')['Title'].tolist() == ['ＡＢＣ Cooking']
+    assert search_index(conn, 'COOKING abc')['Title'].tolist() == ['ＡＢＣ Cooking']
+
+
+def test_reindexing_keeps_one_fts_row(conn):
+    _add(conn, 'a', 'Old title', views=1)
+    _add(conn, 'a', 'New title', views=5)
+    record_search(conn, 'q', ['a'])
+
+    assert conn.execute("SELECT COUNT(*) FROM videos_fts").fetchone()[0] == 1
+    df = search_index(conn, 'new title')
+    assert df['Views'].tolist() == [5]
+    assert search_index(conn, 'old title').empty
+
+
+def test_open_index_rebuilds_unicode61_table(tmp_path):
+    path = str(tmp_path / 'old.db')
+    old = sqlite3.connect(path)
+    old.executescript(video_index.SCHEMA)
+    old.execute(
+        "CREATE VIRTUAL TABLE videos_fts USING fts5("
+        "video_id UNINDEXED, title, channel_title, tokenize='unicode61')"
+    )
+    old.execute(
+        "INSERT INTO videos (video_id, title, channel_title, published_at, duration_sec, view_count, "
+        "like_count, comment_count, subscriber_count) "
+        "VALUES ('z', '東京旅行まとめ', 'Ch', '2026-10-01T00:00:00Z', 60, 1, 0, 0, 0)"
+    )
+    old.execute("INSERT INTO videos_fts (video_id, title, channel_title) VALUES ('z', '東京旅行まとめ', 'ch')")
+    old.commit()
+    old.close()
+
+    conn = open_index(path)
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'videos_fts'").fetchone()[0]
+    assert "trigram" in sql
+    record_search(conn, 'q', ['z'])
+    assert search_index(conn, '旅行')['Title'].tolist() == ['東京旅行まとめ']
+    conn.close()
+
+
+def test_translations_round_trip(conn):
+    assert video_index.get_translation(conn, '여행', 'ja') is None
+    video_index.save_translation(conn, ' 여행 ', 'ja', '旅行')
+    assert video_index.get_translation(conn, '여행', 'ja') == '旅行'
@@ -0,0 +1,220 @@
+import os
+import io
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+DEFAULT_CACHE_DIR = "thumbnail_cache"
+DEFAULT_MAX_CACHE_BYTES = 50 * 1024 * 1024  # 50 MB
+EVICT_LOW_WATER = 0.9  # Evict down to 90% of the cap so eviction doesn't run on every write
+THUMBNAIL_WIDTH = 160  # 2x the results grid's "small" image column, for HiDPI screens
+JPEG_QUALITY = 80
+DEFAULT_TIMEOUT = 2  # seconds
+FAILURE_RETRY_SECONDS = 300  # Don't retry a failed thumbnail for 5 minutes
+MAX_FAILED_URLS = 1000
+
+_state_lock = threading.Lock()
+_failed_urls = {}  # url -> time of the last failed fetch, oldest first
+_cache_sizes = {}  # cache_dir -> estimated bytes on disk
+_pending = set()  # (cache_dir, url) being fetched in the background
+_background_executor = None
+
+
+def _cache_path(cache_dir, url):
+    return os.path.join(cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + ".jpg")
+
+
+def _recently_failed(url):
+    with _state_lock:
+        failed_at = _failed_urls.get(url)
+        if failed_at is None:
+            return False
+        if time.time() - failed_at < FAILURE_RETRY_SECONDS:
+            return True
+        del _failed_urls[url]
+        return False
+
+
+def _remember_failure(url):
+    with _state_lock:
+        _failed_urls.pop(url, None)
+        if len(_failed_urls) >= MAX_FAILED_URLS:
+            del _failed_urls[next(iter(_failed_urls))]
+        _failed_urls[url] = time.time()
+
+
+def _evict(cache_dir, max_cache_bytes):
+    """
+    Rescans the cache and, if it is over max_cache_bytes, deletes least recently
+    used thumbnails until it is under the low-water mark.
+    """
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".jpg"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    if total > max_cache_bytes:
+        target = max_cache_bytes * EVICT_LOW_WATER
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    with _state_lock:
+        _cache_sizes[cache_dir] = total
+
+
+def _track_write(cache_dir, size, max_cache_bytes):
+    """Adds a write to the running cache size and only rescans the directory when it passes the cap."""
+    with _state_lock:
+        total = _cache_sizes.get(cache_dir)
+        if total is not None:
+            total += size
+            _cache_sizes[cache_dir] = total
+
+    # First write in this process, or over the cap: get the real size from disk
+    if total is None or total > max_cache_bytes:
+        _evict(cache_dir, max_cache_bytes)
+
+
+def _read_cached(path):
+    """Returns cached JPEG bytes, or None on a cache miss."""
+    try:
+        # Touch so eviction treats it as recently used
+        os.utime(path)
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None  # Not cached, or evicted meanwhile
+
+
+def fetch_thumbnail(url, cache_dir=DEFAULT_CACHE_DIR, width=THUMBNAIL_WIDTH,
+                    max_cache_bytes=DEFAULT_MAX_CACHE_BYTES, timeout=DEFAULT_TIMEOUT):
+    """
+    Returns the downscaled JPEG bytes of a thumbnail, downloading it on a cache miss.
+    URLs that failed within the last FAILURE_RETRY_SECONDS are not fetched again.
+
+    Returns:
+        bytes: JPEG data, or None if the image could not be fetched or decoded.
+    """
+    path = _cache_path(cache_dir, url)
+
+    data = _read_cached(path)
+    if data is not None:
+        return data
+
+    if _recently_failed(url):
+        return None
+
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            raw = response.read()
+        image = Image.open(io.BytesIO(raw)).convert('RGB')
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+        data = buffer.getvalue()
+    except Exception as e:
+        print(f"Error fetching thumbnail {url}: {e}")
+        _remember_failure(url)
+        return None
+
+    # Write to a unique temp file first so concurrent fetches of the same URL
+    # never see (or clobber) a partial image
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        tmp_path = None
+        _track_write(cache_dir, len(data), max_cache_bytes)
+    except OSError as e:
+        # Caching is best effort; the image itself is still usable
+        print(f"Error caching thumbnail {url}: {e}")
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return data
+
+
+def _fetch_in_background(url, kwargs):
+    """Queues a cache fill for url unless it is already queued or recently failed."""
+    global _background_executor
+
+    if _recently_failed(url):
+        return
+    key = (kwargs.get('cache_dir', DEFAULT_CACHE_DIR), url)
+    with _state_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+        if _background_executor is None:
+            _background_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="thumbnail")
+
+    def fill():
+        try:
+            fetch_thumbnail(url, **kwargs)
+        finally:
+            with _state_lock:
+                _pending.discard(key)
+
+    _background_executor.submit(fill)
+
+
+def _data_uri(data):
+    return "data:image/jpeg;base64," + base64.b64encode(data).decode('ascii')
+
+
+def get_thumbnail_data_uri(url, background=False, **kwargs):
+    """
+    Returns a cached thumbnail as a compact data URI for st.column_config.ImageColumn.
+    Falls back to the original URL if the thumbnail could not be cached.
+
+    Args:
+        background (bool): On a cache miss, return the original URL right away and
+            fill the cache in a background thread instead of waiting for the download.
+    """
+    if not url or url.startswith('data:'):
+        return url
+
+    if background:
+        data = _read_cached(_cache_path(kwargs.get('cache_dir', DEFAULT_CACHE_DIR), url))
+        if data is None:
+            _fetch_in_background(url, kwargs)
+    else:
+        data = fetch_thumbnail(url, **kwargs)
+
+    if data is None:
+        return url
+    return _data_uri(data)
+
+
+def get_thumbnail_data_uris(urls, background=False, max_workers=8, **kwargs):
+    """Converts a list of thumbnail URLs to data URIs, downloading misses in parallel."""
+    if background:
+        # Only disk reads happen on the caller's thread
+        return [get_thumbnail_data_uri(u, background=True, **kwargs) for u in urls]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda u: get_thumbnail_data_uri(u, **kwargs), urls))
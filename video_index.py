@@ -0,0 +1,417 @@
+import sqlite3
+import unicodedata
+import re
+import threading
+import pandas as pd
+from datetime import datetime, timedelta
+from video_rows import format_video_row
+
+DEFAULT_DB_PATH = "video_index.db"
+
+# Streamlit sessions share one connection, so writes must not interleave
+_write_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    channel_id TEXT,
+    channel_title TEXT,
+    published_at TEXT,
+    thumbnail TEXT,
+    video_url TEXT,
+    duration TEXT,
+    duration_sec INTEGER,
+    view_count INTEGER,
+    like_count INTEGER,
+    comment_count INTEGER,
+    subscriber_count INTEGER,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS searches (
+    search_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query_norm TEXT,
+    region_code TEXT,
+    relevance_language TEXT,
+    category_id TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    min_duration_sec INTEGER,
+    max_duration_sec INTEGER,
+    complete INTEGER,
+    fetched_at TEXT
+);
+CREATE TABLE IF NOT EXISTS search_hits (
+    search_id INTEGER,
+    video_id TEXT,
+    PRIMARY KEY (search_id, video_id)
+);
+CREATE TABLE IF NOT EXISTS translations (
+    query_norm TEXT,
+    target_lang TEXT,
+    translated TEXT,
+    PRIMARY KEY (query_norm, target_lang)
+);
+CREATE INDEX IF NOT EXISTS idx_searches_key
+    ON searches (query_norm, region_code, relevance_language, category_id);
+CREATE INDEX IF NOT EXISTS idx_search_hits_video
+    ON search_hits (video_id);
+"""
+
+
+def open_index(db_path=DEFAULT_DB_PATH):
+    """
+    Opens (and creates if needed) the local video metadata index.
+
+    Args:
+        db_path (str): SQLite file path, or ':memory:'.
+
+    Returns:
+        sqlite3.Connection: Connection usable from Streamlit's worker threads.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    # Lets the non-FTS fallback in search_index compare text the same way queries are normalized
+    conn.create_function("normalize_text", 1, normalize_query, deterministic=True)
+    with _write_lock:
+        conn.executescript(SCHEMA)
+        _create_fts(conn)
+        conn.commit()
+    return conn
+
+
+def _create_fts(conn):
+    """
+    Creates the full-text table, keyed by videos.rowid. The trigram tokenizer is
+    used because unicode61 treats a run of Japanese text as a single token.
+    """
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='videos_fts'"
+    ).fetchone()
+    if row and "trigram" in row[0]:
+        return
+
+    try:
+        # Tables from older versions used unicode61 and were keyed by video_id
+        conn.execute("DROP TABLE IF EXISTS videos_fts")
+        conn.execute(
+            "CREATE VIRTUAL TABLE videos_fts USING fts5("
+            "title, channel_title, tokenize='trigram')"
+        )
+    except sqlite3.OperationalError as e:
+        # SQLite without FTS5 or older than 3.34: fall back to LIKE matching in search_index
+        print(f"FTS5 trigram unavailable, using plain text matching: {e}")
+        return
+
+    rows = conn.execute("SELECT rowid, title, channel_title FROM videos").fetchall()
+    conn.executemany(
+        "INSERT INTO videos_fts (rowid, title, channel_title) VALUES (?, ?, ?)",
+        [(rowid, normalize_query(title), normalize_query(channel)) for rowid, title, channel in rows]
+    )
+
+
+def _has_fts(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='videos_fts'"
+    ).fetchone()
+    return row is not None
+
+
+def normalize_query(query):
+    """Normalizes a search query for case, width and whitespace differences."""
+    if not query:
+        return ""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def _key(value):
+    # NULL never compares equal in SQLite, so store "not set" as ''
+    return "" if value is None else str(value)
+
+
+def _like_pattern(term):
+    """Builds a LIKE pattern (used with ESCAPE '\\') matching term anywhere."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def save_translation(conn, query, target_lang, translated):
+    """Remembers a query translation so repeat searches need no translator call."""
+    with _write_lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO translations (query_norm, target_lang, translated) VALUES (?, ?, ?)",
+            (normalize_query(query), target_lang, translated)
+        )
+        conn.commit()
+
+
+def get_translation(conn, query, target_lang):
+    """Returns a previously saved translation of the query, or None."""
+    row = conn.execute(
+        "SELECT translated FROM translations WHERE query_norm = ? AND target_lang = ?",
+        (normalize_query(query), target_lang)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def index_videos(conn, video_data, details_df):
+    """
+    Stores enriched videos in the index, replacing older stats.
+
+    Args:
+        conn: Index connection from open_index.
+        video_data (list): Raw video dictionaries passed to get_video_details.
+        details_df (pd.DataFrame): The matching get_video_details result (same order).
+    """
+    if details_df.empty:
+        return
+
+    now = datetime.now().isoformat()
+    rows = []
+    for video, (_, row) in zip(video_data, details_df.iterrows()):
+        rows.append((
+            video['video_id'],
+            video['title'],
+            video['channel_id'],
+            video['channel_title'],
+            video['published_at'],
+            video['thumbnail'],
+            video['video_url'],
+            row['Duration'],
+            int(row['DurationSec']),
+            int(row['Views']),
+            int(row['Likes']),
+            int(row['Comments']),
+            int(row['Subscribers']),
+            now
+        ))
+
+    with _write_lock:
+        # Upsert rather than INSERT OR REPLACE so a video keeps its rowid, which keys videos_fts
+        conn.executemany(
+            "INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (video_id) DO UPDATE SET "
+            "title = excluded.title, channel_id = excluded.channel_id, "
+            "channel_title = excluded.channel_title, published_at = excluded.published_at, "
+            "thumbnail = excluded.thumbnail, video_url = excluded.video_url, "
+            "duration = excluded.duration, duration_sec = excluded.duration_sec, "
+            "view_count = excluded.view_count, like_count = excluded.like_count, "
+            "comment_count = excluded.comment_count, subscriber_count = excluded.subscriber_count, "
+            "updated_at = excluded.updated_at",
+            rows
+        )
+        if _has_fts(conn):
+            rowids = conn.execute(
+                f"SELECT rowid, title, channel_title FROM videos "
+                f"WHERE video_id IN ({','.join('?' * len(rows))})",
+                [r[0] for r in rows]
+            ).fetchall()
+            conn.executemany(
+                "DELETE FROM videos_fts WHERE rowid = ?",
+                [(rowid,) for rowid, _, _ in rowids]
+            )
+            conn.executemany(
+                "INSERT INTO videos_fts (rowid, title, channel_title) VALUES (?, ?, ?)",
+                [(rowid, normalize_query(title), normalize_query(channel)) for rowid, title, channel in rowids]
+            )
+        conn.commit()
+
+
+def record_search(conn, query, video_ids, start_date=None, end_date=None, category_id=None,
+                  min_duration_sec=None, max_duration_sec=None, region_code=None,
+                  relevance_language=None, complete=False):
+    """
+    Records which videos an API search returned so the same search can be answered locally.
+
+    Args:
+        complete (bool): True if the API had no further results for this search,
+            so the hits are everything a repeat search could find.
+    """
+    with _write_lock:
+        cursor = conn.execute(
+            "INSERT INTO searches (query_norm, region_code, relevance_language, category_id, "
+            "start_date, end_date, min_duration_sec, max_duration_sec, complete, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                normalize_query(query),
+                _key(region_code),
+                _key(relevance_language),
+                _key(category_id),
+                start_date.isoformat() if start_date else None,
+                end_date.isoformat() if end_date else None,
+                min_duration_sec,
+                max_duration_sec,
+                1 if complete else 0,
+                datetime.now().isoformat()
+            )
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO search_hits (search_id, video_id) VALUES (?, ?)",
+            [(cursor.lastrowid, vid) for vid in set(video_ids)]
+        )
+        conn.commit()
+
+
+def _covers(search, start_date, end_date, min_duration_sec, max_duration_sec):
+    """Checks whether a recorded search's bounds contain the requested bounds."""
+    s_start, s_end, s_min, s_max = search
+    if s_start and (not start_date or start_date.isoformat() < s_start):
+        return False
+    if s_end and (not end_date or end_date.isoformat() > s_end):
+        return False
+    if s_min is not None and (min_duration_sec is None or min_duration_sec < s_min):
+        return False
+    if s_max is not None and (max_duration_sec is None or max_duration_sec > s_max):
+        return False
+    return True
+
+
+def _rows_to_dataframe(rows):
+    """Builds a DataFrame with the same columns as youtube_api.get_video_details."""
+    final_data = []
+    for (title, channel_title, published_at, thumbnail, video_url, duration,
+         duration_sec, views, likes, comments, sub_count) in rows:
+        video = {
+            'title': title,
+            'channel_title': channel_title,
+            'published_at': published_at,
+            'thumbnail': thumbnail,
+            'video_url': video_url
+        }
+        stats = {
+            'view_count': views,
+            'like_count': likes,
+            'comment_count': comments,
+            'duration': duration,
+            'duration_sec': duration_sec
+        }
+        final_data.append(format_video_row(video, stats, sub_count))
+    return pd.DataFrame(final_data)
+
+
+VIDEO_COLUMNS = (
+    "v.title, v.channel_title, v.published_at, v.thumbnail, v.video_url, v.duration, "
+    "v.duration_sec, v.view_count, v.like_count, v.comment_count, v.subscriber_count"
+)
+
+
+def _filter_sql(start_date, end_date, min_duration_sec, max_duration_sec):
+    clauses, params = [], []
+    if start_date:
+        clauses.append("v.published_at >= ?")
+        params.append(f"{start_date.isoformat()}T00:00:00Z")
+    if end_date:
+        clauses.append("v.published_at <= ?")
+        params.append(f"{end_date.isoformat()}T23:59:59Z")
+    if min_duration_sec is not None:
+        clauses.append("v.duration_sec >= ?")
+        params.append(min_duration_sec)
+    if max_duration_sec is not None:
+        clauses.append("v.duration_sec <= ?")
+        params.append(max_duration_sec)
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+def lookup_search(conn, query, start_date=None, end_date=None, target_count=50, category_id=None,
+                  min_duration_sec=None, max_duration_sec=None, region_code=None,
+                  relevance_language=None, max_age_hours=24, allow_stale=False):
+    """
+    Answers a search from the index if an earlier API search fully covers it.
+
+    A recorded search covers the request when it used the same normalized query,
+    region, language and category, its date range and duration bounds contain the
+    requested ones, and either it was complete or it still yields target_count
+    videos after the requested filters are applied.
+
+    Args:
+        max_age_hours (float): Recorded searches older than this are stale.
+        allow_stale (bool): Use stale searches anyway instead of returning None.
+
+    Returns:
+        pd.DataFrame or None: Results sorted by views, or None if the API is needed.
+    """
+    candidates = conn.execute(
+        "SELECT search_id, start_date, end_date, min_duration_sec, max_duration_sec, "
+        "complete, fetched_at FROM searches "
+        "WHERE query_norm = ? AND region_code = ? AND relevance_language = ? AND category_id = ? "
+        "ORDER BY fetched_at DESC",
+        (normalize_query(query), _key(region_code), _key(relevance_language), _key(category_id))
+    ).fetchall()
+
+    cutoff = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+    where, params = _filter_sql(start_date, end_date, min_duration_sec, max_duration_sec)
+
+    for search_id, s_start, s_end, s_min, s_max, complete, fetched_at in candidates:
+        if fetched_at < cutoff and not allow_stale:
+            continue
+        if not _covers((s_start, s_end, s_min, s_max), start_date, end_date, min_duration_sec, max_duration_sec):
+            continue
+
+        rows = conn.execute(
+            f"SELECT {VIDEO_COLUMNS} FROM search_hits h JOIN videos v ON v.video_id = h.video_id "
+            f"WHERE h.search_id = ?{where} ORDER BY v.view_count DESC LIMIT ?",
+            [search_id] + params + [target_count]
+        ).fetchall()
+
+        if complete or len(rows) >= target_count:
+            return _rows_to_dataframe(rows)
+
+    return None
+
+
+def search_index(conn, query, start_date=None, end_date=None, target_count=50,
+                 min_duration_sec=None, max_duration_sec=None, region_code=None,
+                 relevance_language=None):
+    """
+    Full-text searches indexed videos by title and channel name.
+
+    Unlike lookup_search this also matches videos collected for related queries,
+    so it is useful as an offline fallback (e.g. when the API quota is exhausted).
+    Only videos found by earlier searches with the same region and language are returned.
+
+    Returns:
+        pd.DataFrame: Matching videos sorted by views (may be empty).
+    """
+    terms = normalize_query(query).split()
+    if not terms:
+        return pd.DataFrame()
+
+    where, params = _filter_sql(start_date, end_date, min_duration_sec, max_duration_sec)
+    where += (
+        " AND EXISTS (SELECT 1 FROM search_hits h JOIN searches s ON s.search_id = h.search_id "
+        "WHERE h.video_id = v.video_id AND s.region_code = ? AND s.relevance_language = ?)"
+    )
+    params += [_key(region_code), _key(relevance_language)]
+
+    if _has_fts(conn):
+        # Trigram MATCH needs at least 3 characters; shorter terms (e.g. "경제") use LIKE
+        long_terms = [t for t in terms if len(t) >= 3]
+        text_where, text_params = "", []
+        if long_terms:
+            text_where += " AND videos_fts MATCH ?"
+            text_params.append(" ".join('"' + t.replace('"', '""') + '"' for t in long_terms))
+        for t in terms:
+            if len(t) < 3:
+                text_where += " AND (f.title LIKE ? ESCAPE '\\' OR f.channel_title LIKE ? ESCAPE '\\')"
+                text_params += [_like_pattern(t), _like_pattern(t)]
+        rows = conn.execute(
+            f"SELECT {VIDEO_COLUMNS} FROM videos_fts f JOIN videos v ON v.rowid = f.rowid "
+            f"WHERE 1=1{text_where}{where} ORDER BY v.view_count DESC LIMIT ?",
+            text_params + params + [target_count]
+        ).fetchall()
+    else:
+        like = "".join(
+            " AND (normalize_text(v.title) LIKE ? ESCAPE '\\' "
+            "OR normalize_text(v.channel_title) LIKE ? ESCAPE '\\')"
+            for _ in terms
+        )
+        like_params = []
+        for t in terms:
+            like_params += [_like_pattern(t), _like_pattern(t)]
+        rows = conn.execute(
+            f"SELECT {VIDEO_COLUMNS} FROM videos v WHERE 1=1{like}{where} "
+            f"ORDER BY v.view_count DESC LIMIT ?",
+            like_params + params + [target_count]
+        ).fetchall()
+
+    return _rows_to_dataframe(rows)
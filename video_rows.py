@@ -0,0 +1,36 @@
+from datetime import datetime
+
+def format_video_row(video, stats, sub_count):
+    """
+    Builds one result row (the columns shown in the app) from a video and its stats.
+
+    Args:
+        video (dict): Video dictionary from search_videos.
+        stats (dict): view_count, like_count, comment_count, duration and duration_sec.
+        sub_count (int): Channel subscriber count.
+
+    Returns:
+        dict: Row for the results DataFrame.
+    """
+    # Calculate Ratio (Views / Subscribers)
+    ratio = 0.0
+    if sub_count > 0:
+        ratio = round(stats['view_count'] / sub_count, 2)
+
+    # Format Published At
+    pub_date = datetime.strptime(video['published_at'], "%Y-%m-%dT%H:%M:%SZ")
+
+    return {
+        'Thumbnail': video['thumbnail'],
+        'Title': video['title'],
+        'Duration': stats['duration'],
+        'DurationSec': stats['duration_sec'],
+        'Channel': video['channel_title'],
+        'Published': pub_date.strftime("%Y-%m-%d"),
+        'Views': stats['view_count'],
+        'Likes': stats['like_count'],
+        'Comments': stats['comment_count'],
+        'Subscribers': sub_count,
+        'Performance (Views/Subs)': f"{ratio}x",
+        'Link': video['video_url']
+    }
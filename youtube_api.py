@@ -3,6 +3,41 @@ from googleapiclient.errors import HttpError
 import pandas as pd
 import isodate
 from datetime import datetime
+import video_index
+from video_rows import format_video_row
+
+# Smallest thumbnail width worth keeping: the results grid's "small" image column at 2x
+THUMBNAIL_MIN_WIDTH = 160
+
+# YouTube thumbnail resolutions and their standard widths, smallest first
+THUMBNAIL_RESOLUTIONS = {
+    'default': 120,
+    'medium': 320,
+    'high': 480,
+    'standard': 640,
+    'maxres': 1280
+}
+
+def pick_thumbnail(thumbnails, min_width=THUMBNAIL_MIN_WIDTH):
+    """
+    Picks the smallest thumbnail URL that is at least min_width pixels wide.
+
+    Args:
+        thumbnails (dict): The snippet['thumbnails'] dict from the YouTube API.
+        min_width (int): Required width in pixels.
+
+    Returns:
+        str: Thumbnail URL (the largest available if none is wide enough).
+    """
+    fallback = None
+    for key, standard_width in THUMBNAIL_RESOLUTIONS.items():
+        thumb = thumbnails.get(key)
+        if not thumb:
+            continue
+        fallback = thumb['url']
+        if thumb.get('width', standard_width) >= min_width:
+            return thumb['url']
+    return fallback
 
 def get_youtube_client(api_key):
     """Initializes the YouTube Data API client."""
@@ -65,7 +100,7 @@ def search_videos(youtube, query, start_date=None, end_date=None, max_results=50
                     'channel_id': item['snippet']['channelId'],
                     'channel_title': item['snippet']['channelTitle'],
                     'published_at': item['snippet']['publishedAt'],
-                    'thumbnail': item['snippet']['thumbnails']['high']['url'],
+                    'thumbnail': pick_thumbnail(item['snippet']['thumbnails']),
                     'video_url': f"https://www.youtube.com/watch?v={item['id']['videoId']}"
                 })
             
@@ -167,40 +202,44 @@ def get_video_details(youtube, video_data):
         stats = video_stats.get(vid, {'view_count': 0, 'like_count': 0, 'comment_count': 0, 'duration': "0:00", 'duration_sec': 0})
         sub_count = channel_stats.get(cid, 0)
         
-        # Calculate Ratio (Views / Subscribers)
-        ratio = 0.0
-        if sub_count > 0:
-            ratio = round(stats['view_count'] / sub_count, 2)
-
-        # Format Published At
-        pub_date = datetime.strptime(video['published_at'], "%Y-%m-%dT%H:%M:%SZ")
-
-        final_data.append({
-            'Thumbnail': video['thumbnail'],
-            'Title': video['title'],
-            'Duration': stats['duration'],
-            'DurationSec': stats['duration_sec'],
-            'Channel': video['channel_title'],
-            'Published': pub_date.strftime("%Y-%m-%d"),
-            'Views': stats['view_count'],
-            'Likes': stats['like_count'],
-            'Comments': stats['comment_count'],
-            'Subscribers': sub_count,
-            'Performance (Views/Subs)': f"{ratio}x",
-            'Link': video['video_url']
-        })
+        final_data.append(format_video_row(video, stats, sub_count))
 
     return pd.DataFrame(final_data)
 
-def search_and_filter_videos(youtube, query, start_date=None, end_date=None, target_count=50, category_id=None, min_duration_sec=None, max_duration_sec=None, region_code=None, relevance_language=None):
+def search_and_filter_videos(youtube, query, start_date=None, end_date=None, target_count=50, category_id=None, min_duration_sec=None, max_duration_sec=None, region_code=None, relevance_language=None, index_conn=None, refresh_stale=True, max_index_age_hours=24):
     """
     Searches, fetches details, and filters videos until the target_count is met.
     Guarantees 'target_count' filtered results if available within safety limits.
+
+    If index_conn (from video_index.open_index) is given, a search already covered
+    by the local index is answered from it without any search().list calls, and
+    every enriched video is stored in it. With refresh_stale=False, index entries
+    older than max_index_age_hours are still used instead of topping up from the API.
     """
+    search_args = dict(
+        start_date=start_date,
+        end_date=end_date,
+        category_id=category_id,
+        min_duration_sec=min_duration_sec,
+        max_duration_sec=max_duration_sec,
+        region_code=region_code,
+        relevance_language=relevance_language
+    )
+    if index_conn is not None:
+        cached_df = video_index.lookup_search(
+            index_conn, query, target_count=target_count,
+            max_age_hours=max_index_age_hours, allow_stale=not refresh_stale, **search_args
+        )
+        if cached_df is not None:
+            print(f"DEBUG: Answered from local index ({len(cached_df)} videos), no API search used.")
+            return cached_df
+
     valid_videos_df = pd.DataFrame()
     next_page_token = None
     processed_count = 0
     safety_limit = 1000  # Increased to 1000 to ensure we find 30 videos even with strict filters
+    indexed_ids = []
+    search_complete = False
     
     # Optimization: Use API's videoDuration if possible
     api_duration_param = None
@@ -239,6 +278,7 @@ def search_and_filter_videos(youtube, query, start_date=None, end_date=None, tar
             
             if not items:
                 print("DEBUG: No more items from search API.")
+                search_complete = True
                 break
                 
             # Parse raw items
@@ -250,7 +290,7 @@ def search_and_filter_videos(youtube, query, start_date=None, end_date=None, tar
                     'channel_id': item['snippet']['channelId'],
                     'channel_title': item['snippet']['channelTitle'],
                     'published_at': item['snippet']['publishedAt'],
-                    'thumbnail': item['snippet']['thumbnails']['high']['url'],
+                    'thumbnail': pick_thumbnail(item['snippet']['thumbnails']),
                     'video_url': f"https://www.youtube.com/watch?v={item['id']['videoId']}"
                 })
             
@@ -258,6 +298,10 @@ def search_and_filter_videos(youtube, query, start_date=None, end_date=None, tar
             
             # 2. Get Details (Duration, Views, etc.)
             batch_df = get_video_details(youtube, raw_videos)
+
+            if index_conn is not None and not batch_df.empty:
+                video_index.index_videos(index_conn, raw_videos, batch_df)
+                indexed_ids += [v['video_id'] for v in raw_videos]
             
             if not batch_df.empty and 'DurationSec' in batch_df.columns:
                 # 3. Filter by Duration
@@ -282,6 +326,7 @@ def search_and_filter_videos(youtube, query, start_date=None, end_date=None, tar
             next_page_token = search_response.get('nextPageToken')
             if not next_page_token:
                 print("DEBUG: End of results (no next page).")
+                search_complete = True
                 break
                 
         except HttpError as e:
@@ -290,10 +335,13 @@ def search_and_filter_videos(youtube, query, start_date=None, end_date=None, tar
                 raise e
             print(f"API Error in loop: {e}")
             break
+
+    if index_conn is not None and indexed_ids:
+        video_index.record_search(index_conn, query, indexed_ids, complete=search_complete, **search_args)
             
     # Final Slice and Sort
     if not valid_videos_df.empty:
         valid_videos_df = valid_videos_df.sort_values(by='Views', ascending=False)
         return valid_videos_df.head(target_count)
 
-    return pd.DataFrame()
\ No newline at end of file
+    return pd.DataFrame()
\ No newline at end of file